@@ -45,10 +45,16 @@ def obtain_mouse_grouping_configuration_from_cli() -> MouseGroupingConfig:
     g_help = "Minimum group size, i.e. how many mice must at least be in each group. Defaults to 5."
     parser.add_argument("-g", "--min-group-size", type=int, default=5, help=g_help)
 
-    s_help = "Number of seconds that the optimization should maximally run for. Defaults to 10."
+    u_help = "Use the MIP solver to optimize the grouping rather than the much faster heuristic. Disabled by default."
+    parser.add_argument("-u", "--use-mip", action="store_true", help=u_help)
+
+    s_help = "Max number of seconds that the optimization (heuristic or MIP) should run for. Defaults to 10."
     parser.add_argument("-s", "--max-seconds", type=int, default=10, help=s_help)
 
-    m_help = "Save the mathematical optimization model as a .lp-file. Disabled by default."
+    t_help = "Number of MIP solver threads. -1 uses all processor cores, 0 uses the solver default. Defaults to -1."
+    parser.add_argument("-t", "--num-threads", type=int, default=-1, help=t_help)
+
+    m_help = "Save the mathematical optimization model as a .lp-file (requires --use-mip). Disabled by default."
     parser.add_argument("-m", "--save-model", action="store_true", help=m_help)
 
     # Parse arguments
@@ -60,7 +66,9 @@ def obtain_mouse_grouping_configuration_from_cli() -> MouseGroupingConfig:
         output_folder_path=args.output_folder
     )
     cfg.min_group_size = args.min_group_size
+    cfg.use_mip = args.use_mip
     cfg.max_seconds = args.max_seconds
+    cfg.num_threads = args.num_threads
     cfg.save_model = args.save_model
     return cfg
 
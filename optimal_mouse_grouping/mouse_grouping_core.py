@@ -3,14 +3,16 @@ Core functionality of the Optimal Mouse Grouping program.
 """
 
 import os
+import tempfile
 from dataclasses import dataclass
 
-from tabulate import tabulate
+import numpy as np
+import pandas as pd
 
-from .mouse_grouping_mip import construct_and_solve_mouse_grouping_model
+from .mouse_grouping_heuristic import compute_heuristic_mouse_grouping
 from .mouse_grouping_utils import compute_group_sizes, construct_mouse_groups_data_frame
-from .mouse_grouping_utils import load_and_verify_mouse_id_and_tumor_size_data_frame, move_column_inplace
-from .mouse_grouping_utils import plot_mouse_groups, print_group_sizes, save_mouse_grouping_as_xlsx
+from .mouse_grouping_utils import load_and_verify_mouse_id_and_tumor_size_data_frame, plot_mouse_groups
+from .mouse_grouping_utils import print_group_sizes, save_mouse_grouping_as_xlsx
 
 
 ########################################################################################################################
@@ -25,7 +27,11 @@ class MouseGroupingConfig:  # pylint: disable=R0902
     output_folder_path: str
 
     min_group_size: int = 5
+    use_mip: bool = False
     max_seconds: int = 10
+    num_threads: int = -1
+    cbc_cuts: int = -1
+    cbc_preprocess: int = -1
     print_model_stats: bool = False
     save_model: bool = False
 
@@ -57,13 +63,17 @@ def print_mouse_grouping_config(cfg: MouseGroupingConfig, show_full: bool = Fals
     print(f"- Input file path:     {cfg.input_file_path}")
     print(f"- Output folder path:  {cfg.output_folder_path}")
     print(f"- Mimimum group size:  {cfg.min_group_size}")
+    print(f"- Use MIP solver:      {cfg.use_mip}")
     print(f"- Maximum seconds:     {cfg.max_seconds}")
+    print(f"- Number of threads:   {cfg.num_threads}")
     print(f"- Save model to file:  {cfg.save_model}")
     print("")
 
     if not show_full:
         return
 
+    print(f"- CBC cuts:            {cfg.cbc_cuts}")
+    print(f"- CBC preprocess:      {cfg.cbc_preprocess}")
     print(f"- Print model stats:   {cfg.print_model_stats}")
     print(f"- XLSX file name:      {cfg.xlsx_file_name}")
     print(f"- Plot file name:      {cfg.plot_file_name}")
@@ -96,16 +106,26 @@ def find_optimal_mouse_grouping(cfg: MouseGroupingConfig) -> None:
     # Print configuration
     print_mouse_grouping_config(cfg)
 
+    # Verify output folder (before doing any work), including that files can be written to it
+    if not os.path.isdir(cfg.output_folder_path):
+        raise NotADirectoryError(f"Output folder not found: \"{cfg.output_folder_path}\"")
+    try:
+        with tempfile.TemporaryFile(dir=cfg.output_folder_path):
+            pass
+    except OSError as e:
+        raise PermissionError(f"Cannot write to output folder: \"{cfg.output_folder_path}\"") from e
+
+    # Construct output file paths. If model should be saved, construct the model save path, otherwise set to None
+    xlsx_file_path = os.path.join(cfg.output_folder_path, cfg.xlsx_file_name)
+    plot_file_path = os.path.join(cfg.output_folder_path, cfg.plot_file_name)
+    model_save_path = os.path.join(cfg.output_folder_path, cfg.model_file_name) if cfg.save_model else None
+
     # Load and verify input data
     df = load_and_verify_mouse_id_and_tumor_size_data_frame(
         cfg.input_file_path, cfg.orig_id_column_name, cfg.orig_tumor_size_column_name,
         cfg.id_column_name, cfg.tumor_size_column_name
     )
 
-    # Verify output folder
-    if not os.path.isdir(cfg.output_folder_path):
-        raise NotADirectoryError(f"Output folder not found: \"{cfg.output_folder_path}\"")
-
     # Define and print group sizes
     num_mice = df.shape[0]
     group_sizes = compute_group_sizes(num_mice, min_group_size=cfg.min_group_size)
@@ -114,37 +134,49 @@ def find_optimal_mouse_grouping(cfg: MouseGroupingConfig) -> None:
     # Extract tumor sizes
     tumor_sizes = df[cfg.tumor_size_column_name].values
 
-    # If model should be saved, construct the model save path, otherwise set to None
-    model_save_path = os.path.join(cfg.output_folder_path, cfg.model_file_name) if cfg.save_model else None
-
-    # Construct and run optimization model
-    mouse_grouping, objective_value, _ = construct_and_solve_mouse_grouping_model(
-        tumor_sizes, group_sizes, cfg.max_seconds, print_model_stats=cfg.print_model_stats,
-        model_save_path=model_save_path
-    )
+    if cfg.use_mip:
+        # Imported here, since importing mip (and loading the CBC library) is slow and only needed when using the MIP
+        from .mouse_grouping_mip import construct_and_solve_mouse_grouping_model  # pylint: disable=C0415
+
+        # Construct and run optimization model
+        mouse_grouping, objective_value, _ = construct_and_solve_mouse_grouping_model(
+            tumor_sizes, group_sizes, cfg.max_seconds, print_model_stats=cfg.print_model_stats,
+            model_save_path=model_save_path, num_threads=cfg.num_threads, cuts=cfg.cbc_cuts,
+            preprocess=cfg.cbc_preprocess
+        )
+    else:
+        if cfg.save_model:
+            print("Note: No model is saved, since the MIP solver is not used.\n")
+
+        # Compute a grouping using the fast heuristic
+        mouse_grouping, objective_value, _ = compute_heuristic_mouse_grouping(
+            tumor_sizes, group_sizes, max_seconds=cfg.max_seconds
+        )
 
     print(f"Objective function value: {objective_value:.1f}\n")
     print("The objective value is the sum of absolute deviations from overall tumor size mean.")
 
-    # Add computed grouping to the data frame
-    df[cfg.group_column_name] = mouse_grouping
-    move_column_inplace(df, cfg.group_column_name, 0)
+    # Add computed grouping to the data frame as the first column
+    df.insert(0, cfg.group_column_name, mouse_grouping)
 
     # Construct data frames for the output XLSX file
     df_groups = construct_mouse_groups_data_frame(df, cfg.id_column_name, cfg.tumor_size_column_name,
                                                   cfg.group_column_name)
-    df_sorted = df.sort_values(by=[cfg.group_column_name, cfg.id_column_name, cfg.tumor_size_column_name])
+    # Sort by group, then ID, then tumor size (np.lexsort takes the sort keys in reverse order of priority). The IDs are
+    # replaced by their rank, since np.lexsort cannot compare IDs that are a mix of numbers and strings.
+    id_ranks = pd.factorize(df[cfg.id_column_name], sort=True)[0]
+    order = np.lexsort((df[cfg.tumor_size_column_name].to_numpy(), id_ranks, df[cfg.group_column_name].to_numpy()))
+    df_sorted = df.iloc[order]
 
     # Show resulting groups as a table
+    from tabulate import tabulate  # pylint: disable=C0415
     print(tabulate(df_groups, showindex=False, headers="keys", tablefmt="psql"))
     print("")
 
     # Save constructed data frames to output XLSX file
-    xlsx_file_path = os.path.join(cfg.output_folder_path, cfg.xlsx_file_name)
     save_mouse_grouping_as_xlsx(df_sorted, df_groups, xlsx_file_path)
 
     # Plot results as a PNG file
-    plot_file_path = os.path.join(cfg.output_folder_path, cfg.plot_file_name)
     plot_mouse_groups(df, cfg.tumor_size_column_name, cfg.group_column_name, plot_file_path)
     print("\nDone!")
 
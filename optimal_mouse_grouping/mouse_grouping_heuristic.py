@@ -0,0 +1,199 @@
+"""
+Functions related to a fast heuristic for the Optimal Mouse Grouping problem, which does not require a MIP solver.
+"""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+########################################################################################################################
+
+
+def compute_heuristic_mouse_grouping(
+        tumor_sizes: np.ndarray,
+        group_sizes: np.ndarray,
+        max_passes: int = 100,
+        max_seconds: Optional[float] = None
+) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    Compute a mouse grouping using a heuristic rather than by solving the MIP.
+
+    The heuristic minimizes the same objective as the MIP formulation, i.e. the sum of absolute group deviations, where
+    the deviation of a group is the sum of its tumor size differences from the overall mean tumor size. It proceeds in
+    two steps:
+    1. A greedy assignment: The mice are assigned in order of decreasing tumor size, in rounds of one mouse per group,
+       where the larger tumor sizes of a round go to the groups that currently have the lower deviations.
+    2. A local search: Pairs of mice in different groups are swapped as long as this reduces the objective value.
+
+    :param tumor_sizes: Array of tumor sizes, one tumor size (float) per mouse.
+    :param group_sizes: Array of group sizes, one group size (integer) per group.
+    :param max_passes: The max number of passes over all groups in the local search.
+    :param max_seconds: The max number of seconds that the local search is allowed to run for. None means no limit.
+    :return: The mouse grouping, the objective value, and the group deviations.
+    """
+    # Verify input
+    if len(tumor_sizes) != sum(group_sizes):
+        raise ValueError("Lenght of tumor_sizes list must equal the sum of the number of mice in the groups.")
+    if max_passes < 0:
+        raise AttributeError("The max number of local search passes cannot be negative.")
+    if max_seconds is not None and max_seconds <= 0:
+        raise AttributeError("The max number of seconds for the local search must be positive.")
+
+    # Tumor size differences (individual differences from overall mean tumor size)
+    d = np.asarray(tumor_sizes, dtype=np.float64) - np.mean(tumor_sizes)
+
+    print("Running heuristic (greedy assignment followed by pairwise swaps)...\n")
+    deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+    assignment = _construct_greedy_assignment(d, group_sizes)
+    num_passes, converged = _improve_assignment_by_pairwise_swaps(d, assignment, len(group_sizes), max_passes, deadline)
+    if not converged:
+        if deadline is not None and time.perf_counter() > deadline:
+            print(f"Note: The local search was stopped at the time limit of {max_seconds} seconds.")
+        else:
+            print(f"Note: The local search was stopped at the max number of passes ({max_passes}).")
+        print("The grouping might be improved by allowing the heuristic to run for longer.")
+    print(f"Heuristic done after {num_passes} local search passes.")
+
+    # Compute group deviations (from the overall mean tumor size) and the objective value
+    group_deviations = np.bincount(assignment, weights=d, minlength=len(group_sizes))
+    objective_value = float(np.abs(group_deviations).sum())
+
+    # Make sure the first group is group 1 rather than group 0
+    mouse_grouping = assignment.astype(np.int32) + 1
+
+    return mouse_grouping, objective_value, group_deviations
+
+
+########################################################################################################################
+
+
+def _construct_greedy_assignment(d: np.ndarray, group_sizes: np.ndarray) -> np.ndarray:
+    """
+    Assign the mice in rounds of one mouse per group (like a serpentine assignment), in order of decreasing tumor size.
+    Within each round, the mouse with the largest tumor size is assigned to the group with the lowest deviation, the
+    second largest to the group with the second lowest deviation, and so on. Rounds that only include the larger groups
+    (when the group sizes differ) are placed in the middle, so these groups get extra mice close to the mean.
+    :param d: Array of tumor size differences from the overall mean tumor size, one per mouse.
+    :param group_sizes: Array of group sizes, one group size (integer) per group.
+    :return: Array of (zero-based) group indices, one per mouse.
+    """
+    group_sizes = np.asarray(group_sizes)
+    num_groups = len(group_sizes)
+    assignment = np.empty(len(d), dtype=np.int64)
+    group_deviations = np.zeros(num_groups, dtype=np.float64)
+
+    # The groups in each round, i.e. the groups with more than t mice in round t
+    rounds = [np.flatnonzero(group_sizes > t) for t in range(int(group_sizes.max(initial=0)))]
+    full_rounds = [groups for groups in rounds if len(groups) == num_groups]
+    partial_rounds = [groups for groups in rounds if len(groups) < num_groups]
+    num_first_rounds = (len(full_rounds) + 1) // 2
+    rounds = full_rounds[:num_first_rounds] + partial_rounds + full_rounds[num_first_rounds:]
+
+    mice_by_decreasing_d = np.argsort(d)[::-1]
+    start = 0
+    for groups in rounds:
+        mice = mice_by_decreasing_d[start:start + len(groups)]
+        start += len(groups)
+        groups_by_increasing_deviation = groups[np.argsort(group_deviations[groups], kind="stable")]
+        assignment[mice] = groups_by_increasing_deviation
+        group_deviations[groups_by_increasing_deviation] += d[mice]
+    return assignment
+
+
+def _improve_assignment_by_pairwise_swaps(  # pylint: disable=R0913
+        d: np.ndarray, assignment: np.ndarray, num_groups: int, max_passes: int, deadline: Optional[float] = None,
+        tol: float = 1e-9
+) -> Tuple[int, bool]:
+    """
+    Improve an assignment in-place by swapping pairs of mice between groups until no swap reduces the objective value.
+    The groups are visited in pairs (p, q) with p < q, and the best swap between each pair is performed as long as it
+    reduces the objective value. For each group p, the swaps with all the remaining groups q are evaluated at once.
+
+    Note: pylint rule ignored: "R0913: Too many arguments (6/5) (too-many-arguments)"
+
+    :param d: Array of tumor size differences from the overall mean tumor size, one per mouse.
+    :param assignment: Array of (zero-based) group indices, one per mouse. Modified in-place.
+    :param num_groups: The number of groups.
+    :param max_passes: The max number of passes over all groups.
+    :param deadline: Time (in terms of time.perf_counter()) at which to stop the search. None means no deadline.
+    :param tol: The minimum reduction of the objective value for a swap to be accepted.
+    :return: The number of passes performed, and whether the search ended because no swap reduces the objective value.
+    """
+    # The mice of each group as a row of a padded matrix, which is updated on each swap rather than recomputed.
+    # Groups smaller than the largest group are padded with -1, and their padded tumor size differences are NaN.
+    members = _construct_group_member_matrix(assignment, num_groups)
+    d_members = np.where(members >= 0, d[members], np.nan)
+    group_deviations = np.bincount(assignment, weights=d, minlength=num_groups)
+    # The group deviations are updated incrementally after each swap, so Kahan summation is used to avoid that rounding
+    # errors accumulate over many swaps. The compensations hold the low-order parts lost in the updates so far.
+    compensations = np.zeros(num_groups, dtype=np.float64)
+    num_passes = 0
+    improved = True
+    while improved and num_passes < max_passes:
+        improved = False
+        num_passes += 1
+        for p in range(num_groups - 1):
+            q_start = p + 1
+            while q_start < num_groups:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return num_passes, False
+                # Change of the deviation of group p (and negated for group q) when swapping mouse a of group p and
+                # mouse b of group q, for all the remaining groups q at once. The array axes are (q - q_start, a, b).
+                delta = d_members[q_start:, np.newaxis, :] - d_members[p, :, np.newaxis]
+                s_p, s_q = group_deviations[p], group_deviations[q_start:, np.newaxis, np.newaxis]
+                gain = abs(s_p) + np.abs(s_q) - np.abs(s_p + delta) - np.abs(s_q - delta)
+                # Swaps involving padding are not possible
+                gain[np.isnan(gain)] = -np.inf
+                # Perform the best swap with the first group q that has an improving swap, and continue from q
+                improving_q_offsets = np.flatnonzero(gain.reshape(len(gain), -1).max(axis=1) > tol)
+                if len(improving_q_offsets) == 0:
+                    break
+                q_offset = improving_q_offsets[0]
+                q = q_start + int(q_offset)
+                a, b = np.unravel_index(np.argmax(gain[q_offset]), gain.shape[1:])
+                delta_ab = float(delta[q_offset, a, b])
+                mouse_a, mouse_b = members[p, a], members[q, b]
+                assignment[mouse_a], assignment[mouse_b] = q, p
+                members[p, a], members[q, b] = mouse_b, mouse_a
+                d_members[p, a], d_members[q, b] = d[mouse_b], d[mouse_a]
+                _kahan_add(group_deviations, compensations, p, delta_ab)
+                _kahan_add(group_deviations, compensations, q, -delta_ab)
+                improved = True
+                q_start = q
+    return num_passes, not improved
+
+
+def _construct_group_member_matrix(assignment: np.ndarray, num_groups: int) -> np.ndarray:
+    """
+    Construct a matrix with the mice of each group in a row, padded with -1 for groups smaller than the largest group.
+    :param assignment: Array of (zero-based) group indices, one per mouse.
+    :param num_groups: The number of groups.
+    :return: Matrix of mouse indices of shape (num_groups, largest group size).
+    """
+    group_sizes = np.bincount(assignment, minlength=num_groups)
+    members = np.full((num_groups, int(group_sizes.max(initial=0))), -1, dtype=np.int64)
+    # Sort the mice by group and place each mouse at its position within its group
+    order = np.argsort(assignment, kind="stable")
+    group_starts = np.cumsum(group_sizes) - group_sizes
+    positions = np.arange(len(assignment)) - group_starts[assignment[order]]
+    members[assignment[order], positions] = order
+    return members
+
+
+def _kahan_add(sums: np.ndarray, compensations: np.ndarray, j: int, value: float) -> None:
+    """
+    Add a value to sums[j] in-place using Kahan (compensated) summation.
+    :param sums: Array of running sums.
+    :param compensations: Array of running compensations, one per sum, initially zero. Modified in-place.
+    :param j: Index of the sum to add the value to.
+    :param value: The value to add.
+    """
+    y = value - compensations[j]
+    t = sums[j] + y
+    compensations[j] = (t - sums[j]) - y
+    sums[j] = t
+
+
+########################################################################################################################
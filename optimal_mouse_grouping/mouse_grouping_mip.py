@@ -3,11 +3,14 @@ Functions related to the MIP (Mixed-Integer Linear Program) formulation of the O
 """
 
 import os
+import time
 from typing import List, Optional, Tuple
 
 import mip
 import numpy as np
 
+from .mouse_grouping_heuristic import compute_heuristic_mouse_grouping
+
 
 ########################################################################################################################
 
@@ -17,7 +20,10 @@ def construct_and_solve_mouse_grouping_model(  # pylint: disable=R0914
         group_sizes: np.ndarray,
         max_seconds: int = 60,
         print_model_stats: bool = False,
-        model_save_path: Optional[str] = None
+        model_save_path: Optional[str] = None,
+        num_threads: int = -1,
+        cuts: int = -1,
+        preprocess: int = -1
 ) -> Tuple[np.ndarray, float, np.ndarray]:
     """
     Construct the mouse grouping optimization model and solve it.
@@ -29,6 +35,9 @@ def construct_and_solve_mouse_grouping_model(  # pylint: disable=R0914
     :param max_seconds: The max number of seconds that the optimization is allowed to run for.
     :param print_model_stats: If basic statistics about the constructed model should be printed.
     :param model_save_path: File path to save the model to.
+    :param num_threads: Number of solver threads. -1 uses all available processor cores, 0 uses the solver default.
+    :param cuts: CBC cutting plane generation. -1 is automatic, 0 is off, and 1, 2, 3 are increasingly aggressive.
+    :param preprocess: CBC preprocessing. -1 is automatic, 0 is off, and 1 is on.
     :return: The optimized mouse grouping, the objective value, and the group deviations.
     """
     # Verify input
@@ -37,8 +46,20 @@ def construct_and_solve_mouse_grouping_model(  # pylint: disable=R0914
     if print_model_stats not in [True, False]:
         raise AttributeError("The argument \"print_model_stats\" must be either True or False.")
 
-    # Construct model
-    model, x, y_pos, y_neg, all_mice, all_groups = construct_mouse_grouping_model(tumor_sizes, group_sizes)
+    # Skip the optimization for degenerate inputs, where the optimal grouping is known without solving the model
+    trivial_solution = compute_trivial_mouse_grouping(tumor_sizes, group_sizes)
+    if trivial_solution is not None:
+        print("Optimization skipped, since every grouping is optimal (single group or identical tumor sizes).\n")
+        if model_save_path is not None and model_save_path != "":
+            print("Note: No model is saved, since the optimization is skipped.\n")
+        return trivial_solution
+
+    # Construct model and configure the solver. The heuristic warm start may use up to half of the time limit.
+    start_time = time.perf_counter()
+    model, x_flat, _, _, _ = construct_mouse_grouping_model(
+        tumor_sizes, group_sizes, warm_start_max_seconds=max_seconds / 2
+    )
+    configure_solver(model, num_threads, cuts, preprocess)
 
     # Print model statistics
     if print_model_stats:
@@ -53,9 +74,10 @@ def construct_and_solve_mouse_grouping_model(  # pylint: disable=R0914
     if model_save_path is not None and model_save_path != "":
         save_optimization_model_to_file(model, model_save_path)
 
-    # Search for a good solution
-    print(f"Running optimization for {max_seconds:.1f} seconds, please wait...\n")
-    status = model.optimize(max_seconds=max_seconds)
+    # Search for a good solution in the remaining time (but at least one second)
+    remaining_seconds = max(max_seconds - (time.perf_counter() - start_time), 1.0)
+    print(f"Running optimization for {remaining_seconds:.1f} seconds, please wait...\n")
+    status = model.optimize(max_seconds=remaining_seconds)
     print("Optimization done.")
 
     # Print optimization status
@@ -64,24 +86,50 @@ def construct_and_solve_mouse_grouping_model(  # pylint: disable=R0914
     # OPTIMAL(0), ERROR(-1), INFEASIBLE(1), UNBOUNDED(2), FEASIBLE(3), INT_INFEASIBLE(4), NO_SOLUTION_FOUND(5)
     # See https://python-mip.readthedocs.io/en/latest/classes.html
 
-    # Convert solution to numpy array
-    x_arr = np.array([[x[i][j].x for j in all_groups] for i in all_mice])
+    # Without a solution, the variables have no values
+    if model.num_solutions == 0:
+        raise ValueError(f"No solution found within {max_seconds:.1f} seconds. Please increase the max seconds.")
+
+    # Extract and verify grouping, group deviations, and objective value from the solution
+    mouse_grouping, objective_value, group_deviations = extract_mouse_grouping_from_solution(
+        model, x_flat, tumor_sizes, group_sizes
+    )
+
+    return mouse_grouping, objective_value, group_deviations
+
+
+########################################################################################################################
+
+
+def extract_mouse_grouping_from_solution(
+        model: mip.model.Model, x_flat: List[mip.entities.Var], tumor_sizes: np.ndarray, group_sizes: np.ndarray
+) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    Extract the mouse grouping from the solution of the mouse grouping optimization model and verify it.
+    :param model: The mouse grouping optimization model, which must have a solution.
+    :param x_flat: The assignment variables of the model as a flat list in row-major order.
+    :param tumor_sizes: Array of tumor sizes, one tumor size (float) per mouse.
+    :param group_sizes: Array of group sizes, one group size (integer) per group.
+    :return: The mouse grouping, the objective value, and the group deviations.
+    """
+    # Convert solution to numpy array in a single pass over the (row-major) flat list of assignment variables
+    num_mice, num_groups = len(tumor_sizes), len(group_sizes)
+    x_arr = np.fromiter((v.x for v in x_flat), dtype=np.float64, count=num_mice * num_groups)
+    x_arr = x_arr.reshape(num_mice, num_groups)
 
     # Verify solution
-    if not np.all(np.isclose(x_arr.sum(axis=1), np.repeat(1, len(all_mice)))):
+    if not np.allclose(x_arr.sum(axis=1), 1.0):
         raise ValueError("The assignment matrix was invalid (axis=1). Please investigate.")
-    if not np.all(np.isclose(x_arr.sum(axis=0), group_sizes)):
+    if not np.allclose(x_arr.sum(axis=0), group_sizes):
         raise ValueError("The assignment matrix was invalid (axis=0). Please investigate.")
 
-    # Extract grouping from solution
-    mouse_grouping = np.where(x_arr)[1]
+    # Extract grouping from solution (argmax is robust to solver tolerances, unlike testing for exact ones)
+    mouse_grouping = x_arr.argmax(axis=1).astype(np.int32)
     # Make sure the first group is group 1 rather than group 0
     mouse_grouping += 1
 
     # Compute group deviations (from the overall mean tumor size)
-    y_pos_arr = np.array([y_pos[j].x for j in all_groups])
-    y_neg_arr = np.array([y_neg[j].x for j in all_groups])
-    group_deviations = y_pos_arr - y_neg_arr
+    group_deviations = (np.asarray(tumor_sizes, dtype=np.float64) - np.mean(tumor_sizes)) @ x_arr
 
     # Extract objective value, i.e. the sum of absolute deviations from overall mean
     objective_value = float(model.objective_value)
@@ -96,67 +144,172 @@ def construct_and_solve_mouse_grouping_model(  # pylint: disable=R0914
 ########################################################################################################################
 
 
-def construct_mouse_grouping_model(
+def compute_trivial_mouse_grouping(
         tumor_sizes: np.ndarray, group_sizes: np.ndarray
-) -> Tuple[mip.model.Model, List[List[mip.entities.Var]], List[mip.entities.Var], List[mip.entities.Var], range, range]:
+) -> Optional[Tuple[np.ndarray, float, np.ndarray]]:
+    """
+    Compute the mouse grouping directly for the degenerate cases where every valid grouping is optimal.
+    This is the case when there is a single group, or when all tumor sizes are equal, as the objective value is zero.
+    :param tumor_sizes: Array of tumor sizes, one tumor size (float) per mouse.
+    :param group_sizes: Array of group sizes, one group size (integer) per group.
+    :return: The mouse grouping, the objective value, and the group deviations, or None if the case is not degenerate.
+    """
+    num_mice, num_groups = len(tumor_sizes), len(group_sizes)
+    if num_mice != sum(group_sizes):
+        raise ValueError("Lenght of tumor_sizes list must equal the sum of the number of mice in the groups.")
+    if num_groups == 1:
+        return np.ones(num_mice, dtype=np.int32), 0.0, np.zeros(1)
+    if num_mice > 0 and np.ptp(tumor_sizes) < 1e-12:
+        # Assign the mice to the groups in order, filling one group at a time
+        mouse_grouping = np.repeat(np.arange(1, num_groups + 1, dtype=np.int32), group_sizes)
+        return mouse_grouping, 0.0, np.zeros(num_groups)
+    return None
+
+
+########################################################################################################################
+
+
+def construct_mouse_grouping_model(
+        tumor_sizes: np.ndarray, group_sizes: np.ndarray, warm_start: bool = True,
+        warm_start_max_seconds: Optional[float] = None
+) -> Tuple[mip.model.Model, List[mip.entities.Var], List[mip.entities.Var], range, range]:
     """
     Construct the mouse grouping optimization model.
+    The assignment variables x_ij are returned as a flat list in row-major order, i.e. x_ij is at index i*num_groups+j.
     :param tumor_sizes: Array of tumor sizes, one tumor size (float) per mouse.
     :param group_sizes: Array of group sizes, one group size (integer) per group.
+    :param warm_start: If the solver should be given an initial solution computed by the heuristic.
+    :param warm_start_max_seconds: The max number of seconds for the heuristic local search. None means no limit.
     :return: The constructed model and its decision variables and ranges.
     """
     #
     # Verify input
     #
-    if not len(tumor_sizes) >= 3 and np.all(np.asarray(tumor_sizes) >= 0):
+    # Convert the tumor sizes to a float array once, to avoid repeated conversions below
+    ts = np.ascontiguousarray(tumor_sizes, dtype=np.float64)
+    if not (len(ts) >= 3 and np.all(ts >= 0)):
         raise AttributeError("There must be at least three tumor sizes and they must all be non-negative.")
-    if not len(group_sizes) >= 2 and np.all(np.asarray(group_sizes) > 0):
+    if not (len(group_sizes) >= 2 and np.all(np.asarray(group_sizes) > 0)):
         raise AttributeError("There must be at least two groups and none of them can be empty.")
-    if len(tumor_sizes) != sum(group_sizes):
+    if len(ts) != sum(group_sizes):
         raise ValueError("Lenght of tumor_sizes list must equal the sum of the number of mice in the groups.")
 
     #
     # Construct model
     #
-    num_mice = len(tumor_sizes)
+    num_mice = len(ts)
     num_groups = len(group_sizes)
 
     all_mice = range(num_mice)
     all_groups = range(num_groups)
 
     model = mip.Model("mouse_grouping", sense=mip.MINIMIZE, solver_name="CBC")
+    # Do not print the CBC solver log
+    model.verbose = 0
 
     # Constants: Group sizes
     g = group_sizes
 
     # Constants: Tumor size differences (individual differences from overall mean tumor size)
-    d = list(np.asarray(tumor_sizes) - np.mean(tumor_sizes))
+    d = ts - ts.mean()
 
     # Decision variables x_ij = 1 if mouse i is in group j, 0 otherwise.
-    x = [[model.add_var(var_type=mip.BINARY, name=f"x_{i}_{j}") for j in all_groups] for i in all_mice]
+    # Kept as a flat row-major list: Mouse i is x_flat[i*num_groups:(i+1)*num_groups], group j is x_flat[j::num_groups].
+    x_flat = [model.add_var(var_type=mip.BINARY, name=f"x_{i}_{j}") for i in all_mice for j in all_groups]
+
+    # Proxy variables (non-negative) z_j for the absolute value of each group's deviation from the overall mean.
+    # These are used in the objective function to minimize the absolute value of deviations from the overall mean.
+    z = [model.add_var(var_type=mip.CONTINUOUS, lb=0, name=f"z_{j}") for j in all_groups]
 
-    # Proxy variables (non-negative) y_pos_j and y_neg_j
-    # These are used in to objective function to minimize the absolute value of deviations from the overall mean.
-    y_pos = [model.add_var(var_type=mip.CONTINUOUS, lb=0, name=f"y_pos_{j}") for j in all_groups]
-    y_neg = [model.add_var(var_type=mip.CONTINUOUS, lb=0, name=f"y_neg_{j}") for j in all_groups]
+    # Note: The constraints below are constructed directly as linear expressions from variable and coefficient lists,
+    # which avoids the per-term overhead of building them with mip.xsum().
 
     # Constraints: The must be a specific number of mice in each of the groups.
     for j in all_groups:
-        model += mip.xsum(x[i][j] for i in all_mice) == g[j], f"Mice_in_group_{j}"
+        x_j = x_flat[j::num_groups]
+        lin_expr = mip.LinExpr(variables=x_j, coeffs=[1.0] * num_mice, const=-float(g[j]), sense="=")
+        model.add_constr(lin_expr, name=f"Mice_in_group_{j}")
 
     # Constraints: Each mouse can only be assigned to one group.
     for i in all_mice:
-        model += mip.xsum(x[i][j] for j in all_groups) == 1, f"Mouse_{i}_in_one_group"
-
-    # Each group's mean deviation (from the overall mean) is set to the difference between the group's proxy variables.
-    # Since they are both non-negative (and their sum is sought minimized), only one of them will differ from zero.
+        x_i = x_flat[i * num_groups:(i + 1) * num_groups]
+        lin_expr = mip.LinExpr(variables=x_i, coeffs=[1.0] * num_groups, const=-1.0, sense="=")
+        model.add_constr(lin_expr, name=f"Mouse_{i}_in_one_group")
+
+    # Each group's proxy variable is bounded from below by both the group's deviation (from the overall mean) and its
+    # negation, i.e. z_j >= dev_j and z_j >= -dev_j. Since the sum of the proxy variables is sought minimized, each of
+    # them will equal the absolute deviation. The coefficients are the same for all groups, so they are built only once.
+    d_coeffs_pos = (-d).tolist() + [1.0]
+    d_coeffs_neg = d.tolist() + [1.0]
     for j in all_groups:
-        model += mip.xsum(d[i] * x[i][j] for i in all_mice) == y_pos[j] - y_neg[j], f"Mean_tumor_diff_in_group_{j}"
+        x_j_and_z_j = x_flat[j::num_groups] + [z[j]]
+        lin_expr = mip.LinExpr(variables=x_j_and_z_j, coeffs=d_coeffs_pos, sense=">")
+        model.add_constr(lin_expr, name=f"Abs_tumor_diff_in_group_{j}_pos")
+        lin_expr = mip.LinExpr(variables=x_j_and_z_j, coeffs=d_coeffs_neg, sense=">")
+        model.add_constr(lin_expr, name=f"Abs_tumor_diff_in_group_{j}_neg")
+
+    # Symmetry breaking: Groups of equal size are interchangeable, so permuting them gives an equally good solution.
+    # Without loss of generality, the first mouse can only be in the first of each set of consecutive equal-size groups.
+    for j in range(1, num_groups):
+        if g[j] == g[j - 1]:
+            x_flat[j].ub = 0.0
+
+    # Warm start: Give the solver a good initial solution, so it does not have to spend time finding a feasible one
+    if warm_start:
+        set_heuristic_warm_start(model, x_flat, ts, group_sizes, max_seconds=warm_start_max_seconds)
 
     # Objective function: Minimize the sum of the proxy variables across groups, i.e. deviations from overall mean.
-    model.objective = mip.minimize(mip.xsum(y_pos[j] + y_neg[j] for j in all_groups))
+    model.objective = mip.minimize(mip.LinExpr(variables=z, coeffs=[1.0] * num_groups))
+
+    return model, x_flat, z, all_mice, all_groups
+
 
-    return model, x, y_pos, y_neg, all_mice, all_groups
+########################################################################################################################
+
+
+def set_heuristic_warm_start(
+        model: mip.model.Model, x_flat: List[mip.entities.Var], tumor_sizes: np.ndarray, group_sizes: np.ndarray,
+        max_seconds: Optional[float] = None
+) -> None:
+    """
+    Compute a mouse grouping using the heuristic and give it to the solver as an initial solution (a MIP start).
+    :param model: The mouse grouping optimization model.
+    :param x_flat: The assignment variables of the model as a flat list in row-major order.
+    :param tumor_sizes: Array of tumor sizes, one tumor size (float) per mouse.
+    :param group_sizes: Array of group sizes, one group size (integer) per group.
+    :param max_seconds: The max number of seconds for the heuristic local search. None means no limit.
+    """
+    num_groups = len(group_sizes)
+    initial_grouping, _, _ = compute_heuristic_mouse_grouping(tumor_sizes, group_sizes, max_seconds=max_seconds)
+    assignment = initial_grouping - 1
+    # Swap the group of the first mouse with the first of its equal-size groups to satisfy the symmetry breaking
+    j_first = j_mouse_0 = assignment[0]
+    while j_first > 0 and group_sizes[j_first - 1] == group_sizes[j_mouse_0]:
+        j_first -= 1
+    in_j_first, in_j_mouse_0 = assignment == j_first, assignment == j_mouse_0
+    assignment[in_j_first], assignment[in_j_mouse_0] = j_mouse_0, j_first
+    model.start = [(x_flat[i * num_groups + j], 1.0) for i, j in enumerate(assignment)]
+
+
+def configure_solver(model: mip.model.Model, num_threads: int = -1, cuts: int = -1, preprocess: int = -1) -> None:
+    """
+    Verify and set the CBC solver settings of the model.
+    :param model: The mouse grouping optimization model.
+    :param num_threads: Number of solver threads. -1 uses all available processor cores, 0 uses the solver default.
+    :param cuts: CBC cutting plane generation. -1 is automatic, 0 is off, and 1, 2, 3 are increasingly aggressive.
+    :param preprocess: CBC preprocessing. -1 is automatic, 0 is off, and 1 is on.
+    """
+    if num_threads < -1:
+        raise AttributeError("The number of threads must be -1 (all cores), 0 (solver default), or positive.")
+    if cuts not in [-1, 0, 1, 2, 3]:
+        raise AttributeError("The argument \"cuts\" must be -1 (automatic), 0 (off), 1, 2, or 3.")
+    if preprocess not in [-1, 0, 1]:
+        raise AttributeError("The argument \"preprocess\" must be -1 (automatic), 0 (off), or 1 (on).")
+
+    # Multiple threads are used in the branch-and-bound search
+    model.threads = num_threads
+    model.cuts = cuts
+    model.preprocess = preprocess
 
 
 ########################################################################################################################
@@ -3,13 +3,15 @@ Utilities and helper functions for the Optimal Mouse Grouping program.
 """
 
 import os
+import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-import matplotlib.pyplot as plt
 import numpy as np
+import openpyxl
 import pandas as pd
-import seaborn as sns
+from xlsxwriter.workbook import Workbook
+from xlsxwriter.worksheet import Worksheet
 
 
 ########################################################################################################################
@@ -33,30 +35,32 @@ def load_and_verify_mouse_id_and_tumor_size_data_frame(
         excel_full_file_path = Path(excel_file_path).resolve()
         raise FileNotFoundError(f"Excel file not found: \"{excel_file_path}\". Full path: \"{excel_full_file_path}\"")
 
-    # Load data frame via pandas
-    df: pd.DataFrame = pd.read_excel(excel_file_path)
+    # Load data frame via openpyxl in read-only mode, which streams the cell values without parsing styles etc.
+    # Only the ID and Tumor Size columns are kept.
+    df: pd.DataFrame = _load_data_frame_from_excel_file(
+        excel_file_path, column_names=[orig_id_column_name, orig_tumor_size_column_name]
+    )
 
     # Verify column names
-    if orig_id_column_name not in df.columns.to_list():
+    if orig_id_column_name not in df.columns:
         raise ValueError(f"Column \"{orig_id_column_name}\" not found in input Excel file. Please fix.")
-    if orig_tumor_size_column_name not in df.columns.to_list():
+    if orig_tumor_size_column_name not in df.columns:
         raise ValueError(f"Column \"{orig_tumor_size_column_name}\" not found in input Excel file. Please fix.")
     if orig_id_column_name == orig_tumor_size_column_name:
         raise ValueError(f"ID and Tumor Size column names cannot be the same: \"{orig_id_column_name}\". Please fix.")
 
     # Check that all IDs are unique
-    if len(df[orig_tumor_size_column_name].unique()) != len(df[orig_tumor_size_column_name]):
+    if df[orig_id_column_name].duplicated().any():
         raise ValueError("Not all Mouse IDs in the input Excel file are unique! Please fix.")
 
     # Check that there are no missing values
-    if df[orig_id_column_name].isna().sum() != 0:
+    if df[orig_id_column_name].isna().any():
         raise ValueError(f"Column \"{orig_id_column_name}\" contains missing values. Please fix.")
-    if df[orig_tumor_size_column_name].isna().sum() != 0:
+    if df[orig_tumor_size_column_name].isna().any():
         raise ValueError(f"Column \"{orig_tumor_size_column_name}\" contains missing values. Please fix.")
 
-    # Check that all tumor sizes are non-negative
-    if not (df[orig_tumor_size_column_name] >= 0).all():
-        raise ValueError("All tumor sizes must be non-negative. Please fix.")
+    # Convert tumor sizes to floats and check that they are non-negative
+    df[orig_tumor_size_column_name] = _convert_and_verify_tumor_sizes(df[orig_tumor_size_column_name])
 
     # Rename columns
     df = df.rename(columns={
@@ -66,6 +70,49 @@ def load_and_verify_mouse_id_and_tumor_size_data_frame(
     return df
 
 
+def _convert_and_verify_tumor_sizes(tumor_sizes: pd.Series) -> pd.Series:
+    """
+    Convert tumor sizes to floats, since whole numbers are read from the Excel file as integers, and verify them.
+    :param tumor_sizes: The Tumor Size column of the input data frame.
+    :return: The tumor sizes as floats.
+    """
+    try:
+        tumor_sizes = tumor_sizes.astype(np.float64)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Column \"{tumor_sizes.name}\" contains non-numeric values. Please fix.") from e
+
+    # Check that all tumor sizes are non-negative
+    if not (tumor_sizes.to_numpy() >= 0).all():
+        raise ValueError("All tumor sizes must be non-negative. Please fix.")
+    return tumor_sizes
+
+
+def _load_data_frame_from_excel_file(excel_file_path: str, column_names: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load the first sheet of an Excel file as a data frame, using the first row as column names.
+    Empty rows are skipped.
+    :param excel_file_path: Path to the Excel file (should end with .xlsx).
+    :param column_names: Names of the columns to keep. Columns not found in the sheet are left out. None keeps all.
+    :return: A data frame of the sheet contents.
+    """
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        col_indices = [i for i, name in enumerate(header) if column_names is None or name in column_names]
+        # Rows are not padded to the width of the header if the sheet lacks size information, so cells at the end of
+        # a row might be missing
+        selected_rows = [
+            [row[i] if i < len(row) else None for i in col_indices]
+            for row in rows if any(value is not None for value in row)
+        ]
+        df: pd.DataFrame = pd.DataFrame(selected_rows, columns=[header[i] for i in col_indices])
+    finally:
+        # Workbooks opened in read-only mode keep the file open until closed
+        workbook.close()
+    return df
+
+
 ########################################################################################################################
 
 
@@ -81,17 +128,12 @@ def compute_group_sizes(num_mice: int, min_group_size: int) -> np.ndarray:
     :param min_group_size: The minimum size of the groups that the mice should be divided into.
     :return: Array of group sizes, one group size (integer) per group.
     """
-    num_groups, num_remainders = np.divmod(num_mice, min_group_size)
-    group_sizes: np.ndarray = np.repeat(min_group_size, repeats=num_groups)
-    # Divide initial remainders onto the groups
-    num_remainders_per_group = int(np.floor(num_remainders / num_groups))
-    # Add these to the groups
-    group_sizes += num_remainders_per_group
-    # Compute final remainders
-    num_final_remainders = num_remainders - num_groups * num_remainders_per_group
-    assert num_final_remainders == num_mice - group_sizes.sum()
-    assert num_final_remainders < num_groups
-    # Add the final remainders to some of the groups
+    num_groups, num_remainders = divmod(num_mice, min_group_size)
+    if num_groups == 0:
+        raise ValueError(f"At least {min_group_size} mice are needed to form a group, but there are only {num_mice}.")
+    # Divide the remainders onto the groups, with the final remainders going to the first groups
+    num_remainders_per_group, num_final_remainders = divmod(num_remainders, num_groups)
+    group_sizes = np.full(num_groups, min_group_size + num_remainders_per_group, dtype=np.int64)
     group_sizes[:num_final_remainders] += 1
     # Verify and return the computed group sizes
     assert group_sizes.sum() == num_mice
@@ -99,19 +141,6 @@ def compute_group_sizes(num_mice: int, min_group_size: int) -> np.ndarray:
     return group_sizes
 
 
-def compute_group_means(df: pd.DataFrame, value_colname: str, group_colname: str) -> pd.Series:
-    """
-    Compute the mean of one column, grouped by another column.
-    Used here to compute the mean tumor size across generated mouse groups.
-    :param df: Input data frame of IDs and Tumor Sizes (read from the input Excel file).
-    :param value_colname: Name of the column that contains the values to group.
-    :param group_colname: Name of the column that contains the grouping variable.
-    :return: The computed group means, e.g. the tumor size means per mouse group.
-    """
-    group_means: pd.Series = df.groupby(group_colname)[value_colname].mean()
-    return group_means
-
-
 ########################################################################################################################
 
 
@@ -121,10 +150,12 @@ def print_group_sizes(group_sizes: np.ndarray) -> None:
     :param group_sizes: Array of group sizes, one group size (integer) per group.
     """
     num_in_total: int = int(np.sum(group_sizes))
-    print("Group sizes:")
-    for group_id, num_in_group in enumerate(group_sizes, start=1):
-        print(f"- Group {group_id}: {num_in_group} mice")
-    print(f"- ({num_in_total} mice in total)\n")
+    # Print all lines at once rather than one line per group
+    lines = ["Group sizes:"]
+    for group_id, num_in_group in enumerate(group_sizes.tolist(), start=1):
+        lines.append(f"- Group {group_id}: {num_in_group} mice")
+    lines.append(f"- ({num_in_total} mice in total)\n")
+    print("\n".join(lines))
 
 
 def construct_mouse_groups_data_frame(
@@ -138,22 +169,29 @@ def construct_mouse_groups_data_frame(
     :param group_column_name: Name of the Group column.
     :return: A data frame summarizing the mouse groups.
     """
-    group_means: pd.Series = compute_group_means(df, tumor_size_column_name, group_column_name)
-    overall_tumor_size_mean: np.float64 = df[tumor_size_column_name].mean()
-    groups_diffs: np.ndarray = group_means.values - overall_tumor_size_mean
-    mouse_ids_in_group: pd.Series = df.groupby(group_column_name)[id_column_name].unique()
-    # https://stackoverflow.com/a/45307119
-    num_mice_in_group: List[int] = [len(lst) for lst in mouse_ids_in_group]
-    mouse_ids_in_group_str: List[str] = [", ".join(map(str, lst)) for lst in mouse_ids_in_group]
-    group: List[int] = list(df.groupby(group_column_name).indices.keys())
+    # Group the mice once and derive all the group statistics from the same groupby object
+    grouped = df.groupby(group_column_name, sort=True, observed=True)
+    group_means: pd.Series = grouped[tumor_size_column_name].mean()
+    group_means_arr: np.ndarray = group_means.to_numpy(copy=False)
+    num_mice_in_group: np.ndarray = grouped.size().to_numpy()
+    # The overall mean is the mean of the group means weighted by the group sizes
+    overall_tumor_size_mean = float((group_means_arr * num_mice_in_group).sum() / num_mice_in_group.sum())
+    groups_diffs: np.ndarray = group_means_arr - overall_tumor_size_mean
+    # Convert all IDs to strings at once, then join them per group
+    mouse_ids_as_str: pd.Series = df[id_column_name].astype(str)
+    mouse_ids_in_group_str: np.ndarray = (
+        mouse_ids_as_str.groupby(df[group_column_name], sort=True).agg(", ".join).to_numpy()
+    )
+    group: np.ndarray = group_means.index.to_numpy(dtype=np.int64)
+    # Give the columns explicit dtypes, so pandas does not have to infer them
     df_dict = {
-        "group": group,
-        "num_mice_in_group": num_mice_in_group,
-        "mouse_ids_in_group": mouse_ids_in_group_str,
-        "tumor_size_mean": group_means,
-        "overall_mean_diff": groups_diffs,
+        "group": pd.Series(group, dtype=np.int64),
+        "num_mice_in_group": pd.Series(num_mice_in_group, dtype=np.int64),
+        "mouse_ids_in_group": pd.Series(mouse_ids_in_group_str, dtype=object),
+        "tumor_size_mean": pd.Series(group_means_arr, dtype=np.float64),
+        "overall_mean_diff": pd.Series(groups_diffs, dtype=np.float64),
     }
-    df_groups = pd.DataFrame(df_dict)
+    df_groups: pd.DataFrame = pd.DataFrame(df_dict)
     return df_groups
 
 
@@ -176,17 +214,22 @@ def save_mouse_grouping_as_xlsx(df_sorted: pd.DataFrame, df_groups: pd.DataFrame
     }
     column_formats_by_sheet_name = get_column_formats_by_sheet_name()
 
-    # Create Excel file and format cells
-    with pd.ExcelWriter(xlsx_file_path, engine="xlsxwriter") as writer:  # type: ignore  # pylint: disable=E0110
+    # Create Excel file and format cells. In constant memory mode, each row is written to the file once the next row is
+    # started, so the rows must be written in order, and the column formats and widths are set before the data rows.
+    with Workbook(xlsx_file_path, {"constant_memory": True}) as workbook:
         for sheet_name, df in data_frames_by_sheet_name.items():
-            # Write data frame as sheet
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-            # Define header formatting
-            _modify_header_row_format(df, writer, sheet_name)
+            worksheet = workbook.add_worksheet(sheet_name)
+            # Look up column indices once per sheet
+            col_idx_by_name = {col_name: col_idx for col_idx, col_name in enumerate(df.columns)}
+            # Write formatted header row
+            _write_header_row(df, workbook, worksheet)
             # Define column formats
-            _modify_column_number_formats(df, writer, sheet_name, column_formats_by_sheet_name[sheet_name])
+            _modify_column_number_formats(workbook, worksheet, column_formats_by_sheet_name[sheet_name],
+                                          col_idx_by_name)
             # Autoadjust column widths
-            _adjust_column_width(df, writer, sheet_name)
+            _adjust_column_width(df, worksheet, col_idx_by_name)
+            # Write data frame values below the header row
+            _write_data_frame_rows(df, worksheet)
 
     print(f"Mouse grouping results saved to \"{xlsx_file_path}\".")
 
@@ -226,113 +269,152 @@ def get_column_formats_by_sheet_name() -> Dict[str, Dict[str, Dict[str, str]]]:
 ########################################################################################################################
 
 
-def _modify_header_row_format(df: pd.DataFrame, writer: pd.ExcelWriter, sheet_name: str) -> None:
+def _write_header_row(df: pd.DataFrame, workbook: Workbook, worksheet: Worksheet) -> None:
     """
-    Format the header row (light blue background color, 1 px border).
-    :param df: Data frame that the sheet was created from.
-    :param writer: The active ExcelWriter object that was just used to create the sheet from the data frame.
-    :param sheet_name: Name of the sheet that will be modified.
+    Write the column names as the header row (light blue background color, 1 px border).
+    :param df: Data frame that the sheet is created from.
+    :param workbook: The workbook that the sheet belongs to.
+    :param worksheet: The sheet that will be modified.
     """
     # Colored header row
-    header_fmt = writer.book.add_format({"bg_color": "#DDEEFF", "border": 1})
+    header_fmt = workbook.add_format({"bg_color": "#DDEEFF", "border": 1})
     header_fmt.set_align("center")
     header_fmt.set_align("vcenter")
     header_fmt.set_bold()
-    for col_name in df:
-        col_idx = df.columns.get_loc(col_name)
-        writer.sheets[sheet_name].write_string(0, col_idx, col_name, cell_format=header_fmt)
+    worksheet.write_row(0, 0, df.columns.tolist(), header_fmt)
+
+
+def _write_data_frame_rows(df: pd.DataFrame, worksheet: Worksheet) -> None:
+    """
+    Write the values of a data frame to a sheet, starting in the row below the header row.
+    The rows are written directly using xlsxwriter, which skips the per-cell formatting overhead of df.to_excel().
+    :param df: Data frame that the sheet is created from.
+    :param worksheet: The sheet that will be modified.
+    """
+    for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_idx, 0, row)
 
 
-def _adjust_column_width(df: pd.DataFrame, writer: pd.ExcelWriter, sheet_name: str, extra_width: int = 2) -> None:
+def _adjust_column_width(df: pd.DataFrame, worksheet: Worksheet, col_idx_by_name: Dict[str, int],
+                         extra_width: int = 2) -> None:
     """
     Automatically adjust the width of the columns in an Excel sheet.
     Inspired by https://stackoverflow.com/a/61617835
-    :param df: Data frame that the sheet was created from.
-    :param writer: The active ExcelWriter object that was just used to create the sheet from the data frame.
-    :param sheet_name: Name of the sheet that will be modified.
+    :param df: Data frame that the sheet is created from.
+    :param worksheet: The sheet that will be modified.
+    :param col_idx_by_name: Dictionary of column indices by column names.
     """
-    for col_name in df:
+    for col_name, col_idx in col_idx_by_name.items():
         if pd.api.types.is_float_dtype(df[col_name]):
-            longest_value = df[col_name].map('${:,.2f}'.format).astype(str).map(len).max()
+            longest_value = _compute_max_float_length(df[col_name].to_numpy())
         else:
-            longest_value = df[col_name].astype(str).map(len).max()
+            longest_value = np.char.str_len(df[col_name].to_numpy().astype(str)).max(initial=0)
         column_length = max(longest_value, len(col_name)) + extra_width
-        col_idx = df.columns.get_loc(col_name)
-        writer.sheets[sheet_name].set_column(col_idx, col_idx, width=column_length)
+        worksheet.set_column(col_idx, col_idx, width=column_length)
 
 
-def _modify_column_number_formats(df: pd.DataFrame, writer: pd.ExcelWriter, sheet_name: str,
-                                  column_formats_by_colum_name: Dict[str, Dict[str, str]]) -> None:
+def _compute_max_float_length(values: np.ndarray) -> int:
     """
-    Modify the number formats of selected columns in an Excel sheet.
-    :param df: Data frame that the sheet was created from.
-    :param writer: The active ExcelWriter object that was just used to create the sheet from the data frame.
-    :param sheet_name: Name of the sheet that will be modified.
-    :param column_formats_by_colum_name: Dictionary of column formats (dicts like {"num_format": "#0"}) by column names.
+    Compute the length of the longest of the given floats when formatted like "$1,234.56", i.e. '${:,.2f}'.format().
+    The length is computed from the largest and the smallest value, so no strings have to be formatted.
+    :param values: Array of floats.
+    :return: The length of the longest formatted value.
     """
-    # Formats need to be added to the workbook before use
-    workbook = writer.book
-    for col_name, col_format in column_formats_by_colum_name.items():
-        # Add formats to workbook before use
-        fmt = workbook.add_format(col_format)
-        # Set text alignment, see https://xlsxwriter.readthedocs.io/format.html#set_align
-        fmt.set_align("center")
-        fmt.set_align("vcenter")
-        # Set column format
-        col_idx = df.columns.get_loc(col_name)
-        writer.sheets[sheet_name].set_column(col_idx, col_idx, cell_format=fmt)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return 0
+    max_length = _compute_float_length(float(values.max()))
+    if values.min() < 0:
+        # Negative values have a minus sign
+        max_length = max(max_length, 1 + _compute_float_length(-float(values.min())))
+    return max_length
 
 
-########################################################################################################################
+def _compute_float_length(value: float) -> int:
+    """
+    Compute the length of a non-negative float when formatted like "$1,234.56" (without sign).
+    :param value: Non-negative float.
+    :return: The length of the formatted value.
+    """
+    value = round(value, 2)
+    num_int_digits = 1 if value < 1 else int(np.floor(np.log10(value))) + 1
+    num_separators = (num_int_digits - 1) // 3
+    # Dollar sign, integer digits, thousands separators, decimal point, and two decimals
+    return 1 + num_int_digits + num_separators + 3
 
 
-def move_column_inplace(df: pd.DataFrame, col_name: str, pos: int) -> None:
+def _modify_column_number_formats(workbook: Workbook, worksheet: Worksheet,
+                                  column_formats_by_colum_name: Dict[str, Dict[str, str]],
+                                  col_idx_by_name: Dict[str, int]) -> None:
     """
-    Move a data frame column in-place, i.e. modifying the given data frame.
-    :param df: A data frame.
-    :param col_name: The name of the column to move.
-    :param pos: The desired position of the column, e.g. 0 to move it to the front.
+    Modify the number formats of selected columns in an Excel sheet.
+    :param workbook: The workbook that the sheet belongs to.
+    :param worksheet: The sheet that will be modified.
+    :param column_formats_by_colum_name: Dictionary of column formats (dicts like {"num_format": "#0"}) by column names.
+    :param col_idx_by_name: Dictionary of column indices by column names.
     """
-    # https://stackoverflow.com/a/58686641
-    column: pd.Series = df.pop(col_name)  # type: ignore
-    df.insert(pos, column.name, column)
+    for col_name, col_format in column_formats_by_colum_name.items():
+        # Add formats to workbook before use, centering the text, see https://xlsxwriter.readthedocs.io/format.html
+        fmt = workbook.add_format({**col_format, "align": "center", "valign": "vcenter"})
+        # Set column format
+        col_idx = col_idx_by_name[col_name]
+        worksheet.set_column(col_idx, col_idx, cell_format=fmt)
 
 
 ########################################################################################################################
 
 
+# If the seaborn plot theme has been set, see plot_mouse_groups()
+_PLOT_THEME_IS_SET = False
+
+
 def plot_mouse_groups(
-        df: pd.DataFrame, tumor_size_column_name: str, group_column_name: str, plot_file_path: str
+        df: pd.DataFrame, tumor_size_column_name: str, group_column_name: str, plot_file_path: str,
+        max_mice_in_swarm_plot: int = 200
 ) -> None:
     """
-    Plot the resulting mouse groups as a violin plot with a swarm plot on top. The plot will be saved as a PNG-file.
+    Plot the mouse groups as a violin plot with a swarm (or strip) plot on top. The plot is saved as a PNG-file.
     :param df: A data frame of mice with information about each (Group, Mouse ID, Tumor Size).
     :param tumor_size_column_name: Name of the Tumor Size column.
     :param group_column_name: Name of the Group column.
     :param plot_file_path: File path to write the PNG to.
+    :param max_mice_in_swarm_plot: The max number of mice to show as a swarm plot. A strip plot is used for more mice.
     """
-    # Use default seaborn theme for plots
-    sns.set_theme()
+    # The plotting packages are imported here, since they are slow to import and only needed for this plot
+    import matplotlib  # pylint: disable=C0415
+    if "matplotlib.pyplot" not in sys.modules:
+        # The plot is only saved to a file, so use the non-interactive Agg backend rather than probing for a GUI backend
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt  # pylint: disable=C0415
+    import seaborn as sns  # pylint: disable=C0415
+
+    # Use default seaborn theme for plots (set only once, since it is kept in the global matplotlib settings)
+    global _PLOT_THEME_IS_SET  # pylint: disable=W0603
+    if not _PLOT_THEME_IS_SET:
+        sns.set_theme()
+        _PLOT_THEME_IS_SET = True
 
     # Define height and aspect ratio of plots
     h, a = 7, 1.6
 
     title = "Optimal Mouse Grouping\n(optimized for equal tumor size average across groups)"
 
-    group_means = compute_group_means(df, tumor_size_column_name, group_column_name)
-    group_means_df = pd.DataFrame(group_means)
-    group_means_df.reset_index(level=0, inplace=True)
+    group_means: pd.Series = df.groupby(group_column_name, sort=True, observed=True)[tumor_size_column_name].mean()
 
     g = sns.catplot(x=group_column_name, y=tumor_size_column_name, kind="violin", inner=None, bw=0.3, data=df,
                     height=h, aspect=a)
-    sns.swarmplot(x=group_column_name, y=tumor_size_column_name, color="k", size=7, data=df, ax=g.ax)
+    if len(df) <= max_mice_in_swarm_plot:
+        sns.swarmplot(x=group_column_name, y=tumor_size_column_name, color="k", size=7, data=df, ax=g.ax)
+    else:
+        # Placing the points of a swarm plot without overlap is slow for many mice, so randomly jitter them instead
+        sns.stripplot(x=group_column_name, y=tumor_size_column_name, color="k", size=7, jitter=0.25, data=df, ax=g.ax)
     g.ax.set_title(title, weight="bold")
     g.ax.set_xlabel(group_column_name.capitalize(), weight="bold")
     g.ax.set_ylabel("Tumor Size [mm\u00b3]", weight="bold")
 
     # Add group means as markers
     # https://matplotlib.org/stable/api/_as_gen/matplotlib.pyplot.plot.html
-    g.ax.plot(group_means_df[tumor_size_column_name], "o", ms=12, mew=2, mec="w", mfc="r")
+    g.ax.plot(group_means.to_numpy(), "o", ms=12, mew=2, mec="w", mfc="r")
 
     # Set tight layout with a little extra padding
     # https://stackoverflow.com/a/14307273/1447415
@@ -37,6 +37,7 @@ def test_find_optimal_mouse_grouping(input_file_path: str = "input/example_input
     
         # Settings
         cfg.min_group_size = 5
+        cfg.use_mip = True
         cfg.max_seconds = 3
         cfg.print_model_stats = True
         cfg.save_model = True
@@ -84,6 +85,109 @@ def test_find_optimal_mouse_grouping(input_file_path: str = "input/example_input
 ########################################################################################################################
 
 
+def test_find_optimal_mouse_grouping_heuristic(input_file_path: str = "input/example_input.xlsx") -> None:
+    """
+    Run the optimal mouse grouping program via Python using the heuristic and verify the outputs.
+    The heuristic is used by default rather than the MIP solver, so no model file is expected to be saved.
+    :param input_file_path: Path to the example input file. Depends on where the test is executed from.
+    """
+    #
+    # Given
+    #
+    # Create temporary output folder that will be deleted after the test
+    with tempfile.TemporaryDirectory(prefix="optimal_mouse_grouping") as temp_folder_path:
+        print(f"Using temporary folder: \"{temp_folder_path}\"")
+
+        # Create a configuration to run
+        cfg = MouseGroupingConfig(
+            input_file_path=input_file_path,
+            output_folder_path=temp_folder_path
+        )
+
+        # Settings
+        cfg.min_group_size = 5
+        cfg.use_mip = False
+        cfg.max_seconds = 3
+        cfg.save_model = True
+
+        #
+        # When
+        #
+        find_optimal_mouse_grouping(cfg)
+
+        #
+        # Then
+        #
+        xlsx_file_path = Path(temp_folder_path) / cfg.xlsx_file_name
+        plot_file_path = Path(temp_folder_path) / cfg.plot_file_name
+        model_file_path = Path(temp_folder_path) / cfg.model_file_name
+
+        # Verify output file existence (no model is saved, since the MIP solver is not used)
+        assert xlsx_file_path.is_file(), "Expected XLSX output file not found."
+        assert plot_file_path.is_file(), "Expected output plot not found."
+        assert not model_file_path.exists(), "No model output file was expected when using the heuristic."
+
+        # Verify the output XLSX file contents
+        _verify_output_xlsx_file_contents(xlsx_file_path)
+
+        print("Integration test done.")
+
+
+########################################################################################################################
+
+
+def test_find_optimal_mouse_grouping_mixed_ids() -> None:
+    """
+    Run the optimal mouse grouping program via Python on an input file with a mix of numeric and text mouse IDs.
+    The output XLSX file is expected to list the mice sorted by group and then by mouse ID.
+    """
+    #
+    # Given
+    #
+    # Create temporary folder that will be deleted after the test
+    with tempfile.TemporaryDirectory(prefix="optimal_mouse_grouping") as temp_folder_path:
+        print(f"Using temporary folder: \"{temp_folder_path}\"")
+
+        # Create an input file with both numeric and text mouse IDs
+        input_file_path = Path(temp_folder_path) / "mixed_ids_input.xlsx"
+        mouse_ids = [12, "A3", 7, "B1", 3, "A1", 9, "C2", 1, "B4", 5, "A2"]
+        tumor_sizes = [23.1, 40.2, 31.5, 18.7, 27.9, 35.0, 22.4, 29.3, 44.8, 26.1, 33.6, 20.9]
+        pd.DataFrame(data={"Mouse ID": mouse_ids, "Tumor size": tumor_sizes}).to_excel(input_file_path, index=False)
+
+        # Create a configuration to run
+        cfg = MouseGroupingConfig(
+            input_file_path=str(input_file_path),
+            output_folder_path=temp_folder_path
+        )
+        cfg.min_group_size = 4
+
+        #
+        # When
+        #
+        find_optimal_mouse_grouping(cfg)
+
+        #
+        # Then
+        #
+        xlsx_file_path = Path(temp_folder_path) / cfg.xlsx_file_name
+        assert xlsx_file_path.is_file(), "Expected XLSX output file not found."
+        _verify_output_xlsx_file_contents(xlsx_file_path)
+
+        # Verify that the mice are sorted by group, and then by mouse ID with numbers before text
+        df = pd.read_excel(xlsx_file_path, sheet_name="mouse_grouping")
+        assert df[cfg.group_column_name].is_monotonic_increasing
+        for _, df_group in df.groupby(cfg.group_column_name):
+            group_ids = df_group[cfg.id_column_name].to_list()
+            numeric_ids = [mouse_id for mouse_id in group_ids if not isinstance(mouse_id, str)]
+            text_ids = [mouse_id for mouse_id in group_ids if isinstance(mouse_id, str)]
+            assert group_ids == sorted(numeric_ids) + sorted(text_ids)
+
+        print("Integration test done.")
+
+
+########################################################################################################################
+
+
 def _verify_lp_model_file_contents(model_file_path: Path) -> None:
     """
     Verify the contents of the generated LP model file that contains the mathematical optimization model.
@@ -0,0 +1,130 @@
+"""
+
+Tests for the mouse grouping heuristic.
+
+"""
+
+import numpy as np
+
+from optimal_mouse_grouping.mouse_grouping_heuristic import compute_heuristic_mouse_grouping
+from optimal_mouse_grouping.mouse_grouping_utils import compute_group_sizes
+
+
+########################################################################################################################
+
+
+def test_compute_heuristic_mouse_grouping_perfect_split() -> None:
+    """
+    Tumor sizes [1, 2, 3, 4] in two groups of two can be split perfectly into {1, 4} and {2, 3}.
+    """
+    #
+    # Given
+    #
+    tumor_sizes = np.array([1.0, 2.0, 3.0, 4.0])
+    group_sizes = np.array([2, 2], dtype=np.int64)
+
+    #
+    # When
+    #
+    mouse_grouping, objective_value, group_deviations = compute_heuristic_mouse_grouping(tumor_sizes, group_sizes)
+
+    #
+    # Then
+    #
+    assert mouse_grouping[0] == mouse_grouping[3]
+    assert mouse_grouping[1] == mouse_grouping[2]
+    assert mouse_grouping[0] != mouse_grouping[1]
+    assert np.isclose(objective_value, 0.0)
+    np.testing.assert_allclose(group_deviations, 0.0, atol=1e-12)
+
+
+########################################################################################################################
+
+
+def test_compute_heuristic_mouse_grouping_valid_grouping() -> None:
+    """
+    The heuristic grouping respects the group sizes, and the objective value equals the sum of absolute deviations.
+    """
+    #
+    # Given
+    #
+    rng = np.random.default_rng(seed=42)
+    tumor_sizes = rng.uniform(5.0, 80.0, size=44)
+    group_sizes = compute_group_sizes(len(tumor_sizes), min_group_size=5)
+
+    #
+    # When
+    #
+    mouse_grouping, objective_value, group_deviations = compute_heuristic_mouse_grouping(tumor_sizes, group_sizes)
+
+    #
+    # Then
+    #
+    np.testing.assert_array_equal(np.bincount(mouse_grouping)[1:], group_sizes)
+    d = tumor_sizes - tumor_sizes.mean()
+    expected_group_deviations = np.array([d[mouse_grouping == j].sum() for j in range(1, len(group_sizes) + 1)])
+    np.testing.assert_allclose(group_deviations, expected_group_deviations)
+    assert np.isclose(objective_value, np.abs(expected_group_deviations).sum())
+
+
+########################################################################################################################
+
+
+def test_compute_heuristic_mouse_grouping_no_improving_swap() -> None:
+    """
+    For groups of different sizes, the heuristic grouping cannot be improved by swapping any two mice between groups.
+    """
+    #
+    # Given
+    #
+    rng = np.random.default_rng(seed=7)
+    tumor_sizes = rng.uniform(5.0, 80.0, size=23)
+    group_sizes = np.array([6, 6, 6, 5], dtype=np.int64)
+
+    #
+    # When
+    #
+    mouse_grouping, objective_value, _ = compute_heuristic_mouse_grouping(tumor_sizes, group_sizes)
+
+    #
+    # Then
+    #
+    np.testing.assert_array_equal(np.bincount(mouse_grouping)[1:], group_sizes)
+    d = tumor_sizes - tumor_sizes.mean()
+    for a in range(len(tumor_sizes)):
+        for b in range(len(tumor_sizes)):
+            if mouse_grouping[a] == mouse_grouping[b]:
+                continue
+            swapped_grouping = mouse_grouping.copy()
+            swapped_grouping[a], swapped_grouping[b] = mouse_grouping[b], mouse_grouping[a]
+            swapped_objective_value = np.abs(np.bincount(swapped_grouping, weights=d)[1:]).sum()
+            assert swapped_objective_value >= objective_value - 1e-9
+
+
+########################################################################################################################
+
+
+def test_compute_heuristic_mouse_grouping_two_large_groups() -> None:
+    """
+    For two large groups, the heuristic finds a grouping where both group means are almost equal to the overall mean.
+    """
+    #
+    # Given
+    #
+    rng = np.random.default_rng(seed=11)
+    tumor_sizes = rng.uniform(5.0, 80.0, size=1000)
+    group_sizes = np.array([500, 500], dtype=np.int64)
+
+    #
+    # When
+    #
+    mouse_grouping, objective_value, _ = compute_heuristic_mouse_grouping(tumor_sizes, group_sizes)
+
+    #
+    # Then
+    #
+    np.testing.assert_array_equal(np.bincount(mouse_grouping)[1:], group_sizes)
+    assert objective_value < 0.01
+
+
+########################################################################################################################
@@ -0,0 +1,44 @@
+"""
+
+Tests for the MIP formulation of the mouse grouping problem.
+
+"""
+
+import numpy as np
+
+from optimal_mouse_grouping.mouse_grouping_mip import compute_trivial_mouse_grouping
+
+
+########################################################################################################################
+
+
+def test_compute_trivial_mouse_grouping() -> None:
+    """
+    A single group or identical tumor sizes give a trivial grouping, while other inputs are not considered trivial.
+    """
+    #
+    # Given
+    #
+    tumor_sizes = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    equal_tumor_sizes = np.full(5, 3.5)
+
+    #
+    # When
+    #
+    single_group_solution = compute_trivial_mouse_grouping(tumor_sizes, np.array([5]))
+    equal_sizes_solution = compute_trivial_mouse_grouping(equal_tumor_sizes, np.array([3, 2]))
+    no_solution = compute_trivial_mouse_grouping(tumor_sizes, np.array([3, 2]))
+
+    #
+    # Then
+    #
+    assert single_group_solution is not None
+    np.testing.assert_array_equal(single_group_solution[0], [1, 1, 1, 1, 1])
+    assert single_group_solution[1] == 0.0
+    assert equal_sizes_solution is not None
+    np.testing.assert_array_equal(np.bincount(equal_sizes_solution[0])[1:], [3, 2])
+    assert equal_sizes_solution[1] == 0.0
+    assert no_solution is None
+
+
+########################################################################################################################
@@ -5,12 +5,18 @@ Tests for the mouse grouping utilities.
 """
 
 import os
+import re
 import tempfile
+import zipfile
 
 import numpy as np
+import openpyxl
 import pandas as pd
+import pytest
 
-from optimal_mouse_grouping.mouse_grouping_utils import compute_group_sizes, save_mouse_grouping_as_xlsx
+from optimal_mouse_grouping.mouse_grouping_utils import compute_group_sizes
+from optimal_mouse_grouping.mouse_grouping_utils import load_and_verify_mouse_id_and_tumor_size_data_frame
+from optimal_mouse_grouping.mouse_grouping_utils import save_mouse_grouping_as_xlsx
 
 
 ########################################################################################################################
@@ -111,19 +117,134 @@ def test_save_mouse_grouping_as_xlsx() -> None:
         "overall_mean_diff": [-1.7255, 0.5577, 0.6445],
     })
 
-    # Generate temporary file path
-    temp_xlsx_file_path = tempfile.NamedTemporaryFile(suffix=".xlsx").name
+    # Create temporary folder for the output file, which is removed again after the test
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_xlsx_file_path = os.path.join(temp_dir, "mouse_grouping.xlsx")
 
+        #
+        # When
+        #
+        save_mouse_grouping_as_xlsx(df_sorted, df_groups, temp_xlsx_file_path)
+
+        #
+        # Then
+        #
+        assert os.path.isfile(temp_xlsx_file_path)
+
+
+########################################################################################################################
+
+
+def test_load_and_verify_mouse_id_and_tumor_size_data_frame_unique_ids() -> None:
+    """
+    Duplicate tumor sizes are allowed in the input Excel file, while duplicate mouse IDs are not.
+    """
     #
-    # When
+    # Given
+    #
+    df_duplicate_tumor_sizes = pd.DataFrame(data={"Mouse ID": [1, 2, 3], "Tumor size": [20.5, 20.5, 31.0]})
+    df_duplicate_ids = pd.DataFrame(data={"Mouse ID": [1, 2, 2], "Tumor size": [20.5, 25.0, 31.0]})
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        duplicate_tumor_sizes_file_path = os.path.join(temp_dir, "duplicate_tumor_sizes.xlsx")
+        duplicate_ids_file_path = os.path.join(temp_dir, "duplicate_ids.xlsx")
+        df_duplicate_tumor_sizes.to_excel(duplicate_tumor_sizes_file_path, index=False)
+        df_duplicate_ids.to_excel(duplicate_ids_file_path, index=False)
+
+        #
+        # When
+        #
+        df = load_and_verify_mouse_id_and_tumor_size_data_frame(
+            duplicate_tumor_sizes_file_path, "Mouse ID", "Tumor size", "mouse_id", "tumor_size"
+        )
+
+        #
+        # Then
+        #
+        assert df["mouse_id"].tolist() == [1, 2, 3]
+        with pytest.raises(ValueError, match="Mouse IDs"):
+            load_and_verify_mouse_id_and_tumor_size_data_frame(
+                duplicate_ids_file_path, "Mouse ID", "Tumor size", "mouse_id", "tumor_size"
+            )
+
+
+########################################################################################################################
+
+
+def test_load_and_verify_mouse_id_and_tumor_size_data_frame_short_row() -> None:
+    """
+    A row that is shorter than the header row, due to a missing tumor size, is reported as a missing value.
+    Such rows occur in sheets without size information, since the rows are then not padded to the width of the sheet.
+    """
     #
-    save_mouse_grouping_as_xlsx(df_sorted, df_groups, temp_xlsx_file_path)
+    # Given
+    #
+    df_missing_tumor_size = pd.DataFrame(data={"Mouse ID": [1, 2, 3], "Tumor size": [20.5, None, 31.0]})
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_file_path = os.path.join(temp_dir, "missing_tumor_size.xlsx")
+        df_missing_tumor_size.to_excel(excel_file_path, index=False)
+        _remove_sheet_dimensions(excel_file_path)
+
+        #
+        # When / Then
+        #
+        with pytest.raises(ValueError, match="missing values"):
+            load_and_verify_mouse_id_and_tumor_size_data_frame(
+                excel_file_path, "Mouse ID", "Tumor size", "mouse_id", "tumor_size"
+            )
+
+
+def _remove_sheet_dimensions(excel_file_path: str) -> None:
+    """
+    Remove the size information (the <dimension> element) from the sheets of an Excel file.
+    Some programs do not write it, and without it, rows read in read-only mode are not padded to the width of the sheet.
+    :param excel_file_path: Path to the Excel file (should end with .xlsx) to modify in-place.
+    """
+    with zipfile.ZipFile(excel_file_path) as zip_file:
+        contents = {name: zip_file.read(name) for name in zip_file.namelist()}
+    with zipfile.ZipFile(excel_file_path, "w") as zip_file:
+        for name, data in contents.items():
+            if name.startswith("xl/worksheets/"):
+                data = re.sub(rb"<dimension [^>]*/>", b"", data)
+            zip_file.writestr(name, data)
+
+
+########################################################################################################################
+
+
+def test_load_and_verify_mouse_id_and_tumor_size_data_frame_first_sheet() -> None:
+    """
+    The data is loaded from the first sheet, even if another sheet was active when the Excel file was saved.
+    """
+    #
+    # Given
+    #
+    workbook = openpyxl.Workbook()
+    data_sheet = workbook.active
+    data_sheet.title = "data"
+    for row in [("Mouse ID", "Tumor size"), (1, 20.5), (2, 25.0), (3, 31.0)]:
+        data_sheet.append(row)
+    notes_sheet = workbook.create_sheet("notes")
+    notes_sheet.append(("Some notes about the experiment",))
+    workbook.active = 1
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        excel_file_path = os.path.join(temp_dir, "notes_sheet_active.xlsx")
+        workbook.save(excel_file_path)
+
+        #
+        # When
+        #
+        df = load_and_verify_mouse_id_and_tumor_size_data_frame(
+            excel_file_path, "Mouse ID", "Tumor size", "mouse_id", "tumor_size"
+        )
 
     #
     # Then
     #
-    assert os.path.isfile(temp_xlsx_file_path)
-    os.remove(temp_xlsx_file_path)
+    assert df["mouse_id"].tolist() == [1, 2, 3]
+    assert df["tumor_size"].tolist() == [20.5, 25.0, 31.0]
 
 
 ########################################################################################################################